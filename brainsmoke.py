@@ -31,6 +31,10 @@ def calc_rev_crc16_table(s, table, start=0x0000):
 def calc_table(poly):
     return tuple( calc_rev_crc16([i], poly) for i in range(256))
 
+# Precomputed table for the Pico's polynomial; calc_rev_crc16_table with
+# this table is ~8x faster than the bit-serial calc_rev_crc16
+TABLE_1189 = calc_table(0x1189)
+
 if False:
     table = calc_table(0x1189)
 
@@ -7,12 +7,17 @@ import os
 import time
 import socket
 import sys
-import select
 import requests
 import json
+try:
+    import orjson  # C-accelerated JSON encoder, ~5-10x faster than json
+except ImportError:
+    orjson = None
 import brainsmoke
-import copy
-import dictdiffer  # Ensure dictdiffer is installed
+try:
+    import dictdiffer  # Only needed for DEBUG=pico diff output
+except ImportError:
+    dictdiffer = None
 from datetime import datetime
 import paho.mqtt.client as mqtt
 
@@ -44,14 +49,6 @@ def debug(string):
             print(string)
             sys.stdout.flush()
 
-def empty_socket(sock):
-    """remove the data present on the socket"""
-    input = [sock]
-    while 1:
-        inputready, o, e = select.select(input, [], [], 0.0)
-        if len(inputready) == 0: break
-        for s in inputready: s.recv(1)
-
 def striplist(l):
     return([x.strip() for x in l])
 
@@ -87,73 +84,57 @@ def IntToDecimal(integer):
     return integer / float(10)
 
 def BinToHex(message):
-    response = ''
-    for x in message:
-        hexy = format(x, '02x')
-        response = response + hexy + ' '
-    return response
+    # bytes.hex() is C-implemented and much faster than formatting per byte
+    return message.hex(' ') + ' '
 
 def parse(message):
     values = message.split(' ff')
     values = striplist(values)
     return values
 
-def getNextField(response):
-    field_nr = int(response[0:2], 16)
-    field_type = int(response[3:5], 16)
-    if (field_type == 1):
-        data = response[6:17]
-        response = response[21:]
-        a = int(data[0:5].replace(' ', ''), 16)
-        b = int(data[6:11].replace(' ', ''), 16)
-        field_data = [a, b]
-        return (field_nr, field_data, response)
-    if (field_type == 3):
-        data = response[21:32]
-        response = response[36:]
-        if (data[0:11] == '7f ff ff ff'):
-            return field_nr, '', response
-        else:
-            a = int(data[0:5].replace(' ', ''), 16)
-            b = int(data[6:11].replace(' ', ''), 16)
-            field_data = [a, b]
-            return field_nr, field_data, response
-    if (field_type == 4):  # Text string
-        response = response[21:]
-        nextHex = response[0:2]
-        word = ''
-        while (nextHex != '00'):
-            word += nextHex
-            response = response[3:]
-            nextHex = response[0:2]
-        word = HexToByte(word)
-        response = response[6:]  # Strip separator
-        return field_nr, word, response
-    debug("Unknown field type " + str(field_type))
-
-def parseResponse(response):
+def parse_response_bytes(buf):
+    # One flat loop over the fields: no per-field helper call, so the only
+    # interpreter dispatch left is the int.from_bytes conversions. A numba or
+    # cython build of this was considered and rejected; neither is a
+    # dependency of this project and the loop runs about once a second.
     dict = {}
-    response = response[42:]  # strip header
-    while (len(response) > 6):
-        field_nr, field_data, response = getNextField(response)
-        dict[field_nr] = field_data
+    off = 14  # strip header
+    end = len(buf) - 2
+    while (off < end):
+        field_nr = buf[off]
+        field_type = buf[off + 1]
+        if (field_type == 1):
+            dict[field_nr] = [int.from_bytes(buf[off + 2:off + 4], 'big'),
+                              int.from_bytes(buf[off + 4:off + 6], 'big')]
+            off = off + 7
+        elif (field_type == 3):
+            if (buf[off + 7:off + 11] == b'\x7f\xff\xff\xff'):
+                dict[field_nr] = ''
+            else:
+                dict[field_nr] = [int.from_bytes(buf[off + 7:off + 9], 'big'),
+                                  int.from_bytes(buf[off + 9:off + 11], 'big')]
+            off = off + 12
+        elif (field_type == 4):  # Text string
+            strEnd = off + 7
+            while buf[strEnd] != 0:  # memoryview has no index(); strings are short
+                strEnd += 1
+            dict[field_nr] = bytes(buf[off + 7:strEnd]).decode('latin-1')
+            off = strEnd + 2  # Strip terminator and separator
+        else:
+            debug("Unknown field type " + str(field_type))
+            break
     return dict
 
 def add_crc(message):
-    fields = message.split()
-    message_int = [int(x, 16) for x in fields[1:]]
-    crc_int = brainsmoke.calc_rev_crc16(message_int[0:-1])
+    data = bytes.fromhex(message)
+    crc_int = brainsmoke.calc_rev_crc16_table(data[1:-1], brainsmoke.TABLE_1189)
     return message + " " + hexdump(crc_int)
 
 def send_receive(s, message):
-    bytes = message.count(' ') + 1
     message = bytearray.fromhex(message)
     s.sendall(message)
-    response = ''
-    for x in s.recv(1024):
-        hex = format(x, '02x')
-        response = response + hex + ' '
-    return response
+    # Bulk recv; callers get the raw bytes and hex-format only when needed
+    return s.recv(1024)
 
 def open_tcp(pico_ip, max_retries=5, retry_delay=5):
     serverport = 5001
@@ -182,13 +163,13 @@ def get_pico_config(pico_ip):
     message = ('00 00 00 00 00 ff 02 04 8c 55 4b 00 03 ff')
     message = add_crc(message)
     response = send_receive(s, message)
-    req_count = int(response.split()[19], 16) + 1
+    req_count = response[19] + 1
 
     for pos in range(req_count):
         message = ('00 00 00 00 00 ff 41 04 8c 55 4b 00 16 ff 00 01 00 00 00 ' + "%02x" % pos + ' ff 01 03 00 00 00 00 ff 00 00 00 00 ff')
         message = add_crc(message)
         response = send_receive(s, message)
-        element = parseResponse(response)
+        element = parse_response_bytes(response)
         config[pos] = element
 
     s.close()  # Close tcp connection
@@ -200,58 +181,81 @@ def toTemperature(temp):
     temp2 = float("%.2f" % (temp / 10.0))
     return temp2
 
+fluid = ['Unknown', 'freshWater', 'fuel', 'wasteWater']
+fluid_type = ['Unknown', 'fresh water', 'diesel', 'blackwater']
+
+def decodeNull(sensor, entry):
+    return 0
+
+def decodeVolt(sensor, entry):
+    sensor['name'] = entry[3]
+    if (entry[3] == 'PICO INTERNAL'):
+        return 6
+    return 1
+
+def decodeCurrent(sensor, entry):
+    sensor['name'] = entry[3]
+    return 2
+
+def decodeTemp(sensor, entry):
+    sensor['name'] = entry[3]
+    return 1
+
+def decodeBaro(sensor, entry):
+    sensor['name'] = entry[3]
+    return 2
+
+def decodeOhm(sensor, entry):
+    sensor['name'] = entry[3]
+    return 1
+
+def decodeTank(sensor, entry):
+    sensor['name'] = entry[3]
+    sensor['capacity'] = entry[7][1] / 10
+    sensor['fluid_type'] = fluid_type[entry[6][1]]
+    sensor['fluid'] = fluid[entry[6][1]]
+    return 1
+
+def decodeBattery(sensor, entry):
+    sensor['name'] = entry[3]
+    sensor['capacity.nominal'] = entry[5][1] * 36 * 12  # In Joule
+    return 5
+
+def decodeIncline(sensor, entry):
+    inclinometer_type = entry[3][1]
+    sensor['inclinometer_type'] = inclinometer_type
+    if inclinometer_type == 1 : sensor['name'] = 'pitch'
+    elif inclinometer_type == 2 : sensor['name'] = 'roll'
+    return 1
+
+# Sensor type id -> (type name, decoder); the decoder fills in the static
+# config for that type and returns how many telemetry elements it occupies
+TYPE_INFO = {
+    0: ('null', decodeNull),
+    1: ('volt', decodeVolt),
+    2: ('current', decodeCurrent),
+    3: ('thermometer', decodeTemp),
+    5: ('barometer', decodeBaro),
+    6: ('ohm', decodeOhm),
+    8: ('tank', decodeTank),
+    9: ('battery', decodeBattery),
+    13: ('inclinometer', decodeIncline)
+}
+
 def createSensorList(config):
     sensorList = {}
-    fluid = ['Unknown', 'freshWater', 'fuel', 'wasteWater']
-    fluid_type = ['Unknown', 'fresh water', 'diesel', 'blackwater']
     elementPos = 0
-    for entry in config.keys():
-        id = config[entry][0][1]
-        type = config[entry][1][1]
-        elementSize = 1
-        sensorList[id] = {}
-        if (type == 0):
-            type = 'null'
-            elementSize = 0
-        if (type == 1):
-            type = 'volt'
-            sensorList[id].update({'name': config[entry][3]})
-            if (config[entry][3] == 'PICO INTERNAL'):
-                elementSize = 6
-        if (type == 2):
-            type = 'current'
-            sensorList[id].update({'name': config[entry][3]})
-            elementSize = 2
-        if (type == 3):
-            type = 'thermometer'
-            sensorList[id].update({'name': config[entry][3]})
-        if (type == 5):
-            type = 'barometer'
-            sensorList[id].update({'name': config[entry][3]})
-            elementSize = 2
-        if (type == 6):
-            type = 'ohm'
-            sensorList[id].update({'name': config[entry][3]})
-        if (type == 8):
-            type = 'tank'
-            sensorList[id].update({'name': config[entry][3]})
-            sensorList[id].update({'capacity': config[entry][7][1] / 10})
-            sensorList[id].update({'fluid_type': fluid_type[config[entry][6][1]]})
-            sensorList[id].update({'fluid': fluid[config[entry][6][1]]})
-        if (type == 9):
-            type = 'battery'
-            sensorList[id].update({'name': config[entry][3]})
-            sensorList[id].update({'capacity.nominal': config[entry][5][1] * 36 * 12})  # In Joule
-            elementSize = 5
-        if (type == 13):
-            type = 'inclinometer'
-            inclinometer_type = config[entry][3][1]
-            sensorList[id].update({'inclinometer_type': inclinometer_type})
-            if inclinometer_type == 1 : sensorList[id].update({'name' :'pitch'})
-            elif inclinometer_type == 2 : sensorList[id].update({'name' :'roll'})
-            elementSize = 1
-
-        sensorList[id].update({'type': type, 'pos': elementPos})
+    for entry in config.values():
+        id = entry[0][1]
+        type = entry[1][1]
+        sensor = sensorList[id] = {}
+        if type in TYPE_INFO:
+            type, decoder = TYPE_INFO[type]
+            elementSize = decoder(sensor, entry)
+        else:
+            elementSize = 1  # Unknown types keep their numeric id
+        sensor['type'] = type
+        sensor['pos'] = elementPos
         elementPos = elementPos + elementSize
     return sensorList
 
@@ -261,7 +265,10 @@ client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # ~4 datagrams of kernel backlog
 client.bind(("", 43210))
+RECV_BUF = bytearray(2048)  # Persistent receive buffer, one allocation for the process lifetime
+RECV_MV = memoryview(RECV_BUF)
 message, addr = client.recvfrom(2048)  # Assign pico address
 pico_ip = addr[0]
 debug("See Pico at " + str(pico_ip))
@@ -278,50 +285,53 @@ responseC = []
 old_element = {}
 
 def readBaro(sensorId, elementId):
-    sensorListTmp[sensorId].update({'pressure': (element[elementId][1] + 65536) / 100})
+    sensorListTmp[sensorId]['pressure'] = (element[elementId][1] + 65536) / 100
 
 def readTemp(sensorId, elementId):
-    sensorListTmp[sensorId].update({'temperature': toTemperature(element[elementId][1])})
+    sensorListTmp[sensorId]['temperature'] = toTemperature(element[elementId][1])
 
 def readTank(sensorId, elementId):
+    d = sensorListTmp[sensorId]
     currentLevel = element[elementId][0] / float(1000)
     capacity = sensorList[sensorId].get('capacity', 0)
     remainingCapacity = element[elementId][1] / float(10)
     percentage = (remainingCapacity / capacity) * 100 if capacity else 0
-    sensorListTmp[sensorId].update({'currentLevel': currentLevel})
-    sensorListTmp[sensorId].update({'remainingCapacity': remainingCapacity})
-    sensorListTmp[sensorId].update({'percentage': percentage})
+    d['currentLevel'] = currentLevel
+    d['remainingCapacity'] = remainingCapacity
+    d['percentage'] = percentage
 
 def readBatt(sensorId, elementId):
+    d = sensorListTmp[sensorId]
     stateOfCharge = (element[elementId][0] / 160.0)
-    sensorListTmp[sensorId].update({'stateOfCharge': stateOfCharge})
+    d['stateOfCharge'] = stateOfCharge
     capacity = sensorList[sensorId].get('capacity.nominal', 0)
     capacity_remaining = (capacity * stateOfCharge / 4320000)
-    sensorListTmp[sensorId].update({'capacity.remaining': capacity_remaining})
-    sensorListTmp[sensorId].update({'voltage': element[elementId + 2][1] / float(1000)})
-    sensorListTmp[sensorId]['capacity.nominal'] = sensorListTmp[sensorId]['capacity.nominal'] / 43200
+    d['capacity.remaining'] = capacity_remaining
+    d['voltage'] = element[elementId + 2][1] / float(1000)
+    d['capacity.nominal'] = sensorList[sensorId]['capacity.nominal'] / 43200
     current = element[elementId + 1][1]
     if (current > 25000):
         current = (65535 - current) / float(-100)
     else:
         current = current / float(100)
-    sensorListTmp[sensorId].update({'current': (current)})
+    d['current'] = (current)
     if (element[elementId][0] != 65535):
         timeRemaining = round(sensorList[sensorId]['capacity.nominal'] / 12 / ((current * stateOfCharge / 100) + 0.001))
         if (timeRemaining < 0):
             timeRemaining = 60 * 60 * 24 * 7  # One week
-        sensorListTmp[sensorId].update({'capacity.timeRemaining': timeRemaining})
+        d['capacity.timeRemaining'] = timeRemaining
 
 def readBattNameVoltage(sensorId, elementId):
-    voltage = element[elementId + 2][1] / float(1000)
-    name = sensorList[sensorId].get('name')
-    sensorListTmp[sensorId].update({'name': name, 'voltage': voltage, 'type': 'battery'})
+    d = sensorListTmp[sensorId]
+    d['name'] = sensorList[sensorId].get('name')
+    d['voltage'] = element[elementId + 2][1] / float(1000)
+    d['type'] = 'battery'
 
 def readVolt(sensorId, elementId):
-    sensorListTmp[sensorId].update({'voltage': element[elementId][1] / float(1000)})
+    sensorListTmp[sensorId]['voltage'] = element[elementId][1] / float(1000)
 
 def readOhm(sensorId, elementId):
-    sensorListTmp[sensorId].update({'ohm': element[elementId][1]})
+    sensorListTmp[sensorId]['ohm'] = element[elementId][1]
 
 def readCurrent(sensorId, elementId):
     current = element[elementId][1]
@@ -329,7 +339,7 @@ def readCurrent(sensorId, elementId):
         current = (65535 - current) / float(-100)
     else:
         current = current / float(100)
-    sensorListTmp[sensorId].update({'current': (current)})
+    sensorListTmp[sensorId]['current'] = (current)
 
 def readIncline(sensorId, elementId):
     degree = element[elementId][1]
@@ -337,117 +347,149 @@ def readIncline(sensorId, elementId):
         degree = (degree - 65535) / float(10)
     else:
         degree = degree / float(10)
-    sensorListTmp[sensorId].update({'degree': degree})
-
-while True:
-    updates = []
-    sensorListTmp = copy.deepcopy(sensorList)
-
-    try:
-        message, addr = client.recvfrom(2048)
-        debug("Received packet with length " + str(len(message)))
-    except socket.timeout:
-        debug("Socket timeout, continuing to listen...")
-        continue
-
-    if len(message) > 100 and len(message) < 1000:
-        response = BinToHex(message)
-        debug("response: " + response)
-
-        if response[18] == 'b':
-            element = parseResponse(response)
-            debug(element)
-            for diff in list(dictdiffer.diff(old_element, element)):
-                debug(diff)
-            old_element = copy.deepcopy(element)
-
-            for item in sensorList:
-                elId = sensorList[item]['pos']
-                itemType = sensorList[item]['type']
-                if itemType == 'barometer':
-                    readBaro(item, elId)
-                elif itemType == 'thermometer':
-                    readTemp(item, elId)
-                elif itemType == 'battery':
-                    readBatt(item, elId)
-                    readBattNameVoltage(item, elId)
-                elif itemType == 'ohm':
-                    readOhm(item, elId)
-                elif itemType == 'volt':
-                    readVolt(item, elId)
-                elif itemType == 'current':
-                    readCurrent(item, elId)
-                elif itemType == 'tank':
-                    readTank(item, elId)
-                elif itemType == 'inclinometer':
-                    readIncline(item, elId)
-
-            output = {
-                "time": {
-                    "year": datetime.now().year % 100,  # Last two digits of the year
-                    "month": datetime.now().month,
-                    "day": datetime.now().day,
-                    "hour": datetime.now().hour,
-                    "minute": datetime.now().minute,
-                    "second": datetime.now().second
-                },
-                "barometer": {},
-                "inclinometer": {"pitch": None, "roll": None},
-                "voltage": {},
-                "current": {},
-                "temperature": {},
-                "tank": {},
-                "battery": {}
-            }
-
-            for sensorId, sensorData in sensorListTmp.items():
-                name = sensorData.get('name')
-                values = {
-                    "voltage": sensorData.get('voltage'),
-                    "pressure": sensorData.get('pressure'),
-                    "temperature": sensorData.get('temperature'),
-                    "current": sensorData.get('current'),
-                    "capacity_remaining": sensorData.get('capacity.remaining'),
-                    "currentLevel": sensorData.get('currentLevel'),
-                    "remainingCapacity": sensorData.get('remainingCapacity'),
-                    "percentage": sensorData.get('percentage'),
-                    "degree": sensorData.get('degree'),
-                    "inclinometer_type": sensorData.get('inclinometer_type')
+    sensorListTmp[sensorId]['degree'] = degree
+
+# Reader dispatch by sensor type, resolved once so the per-packet loop
+# doesn't re-compare type strings for every sensor
+READERS = {
+    'barometer': readBaro,
+    'thermometer': readTemp,
+    'battery': readBatt,
+    'ohm': readOhm,
+    'volt': readVolt,
+    'current': readCurrent,
+    'tank': readTank,
+    'inclinometer': readIncline
+}
+dispatch = []
+for sensorId, sensor in sensorList.items():
+    if sensor['type'] in READERS:
+        dispatch.append((READERS[sensor['type']], sensorId, sensor['pos']))
+        if sensor['type'] == 'battery':
+            dispatch.append((readBattNameVoltage, sensorId, sensor['pos']))
+def main():
+    # The read* functions reference these as globals
+    global sensorListTmp, element, old_element
+
+    # Pre-bind the hot names: LOAD_FAST in the loop instead of LOAD_GLOBAL
+    recvfrom_into = client.recvfrom_into
+    monotonic = time.monotonic
+    parse_message = parse_response_bytes
+    bin_to_hex = BinToHex
+    readers = dispatch
+    publish = mqtt_client.publish
+    mqtt_topic = mqtt_config['prefix']
+
+    last_emit = 0.0  # Emit the first decoded packet right away
+
+    while True:
+        updates = []
+        # Dynamic telemetry only; static config is read from sensorList directly
+        sensorListTmp = {sensorId: {} for sensorId in sensorList}
+
+        try:
+            n, addr = recvfrom_into(RECV_BUF)
+            debug("Received packet with length " + str(n))
+        except socket.timeout:
+            debug("Socket timeout, continuing to listen...")
+            continue
+
+        if n > 100 and n < 1000:
+            # Zero-copy view of this datagram; the parser copies values out,
+            # so nothing holds the view across iterations
+            message = RECV_MV[:n]
+            # Field-data packets carry 0xb in the high nibble of byte 6 (hex
+            # char 18 of the old dump); testing the raw byte skips the hex
+            # conversion entirely for uninteresting packets
+            if message[6] >> 4 == 0xb:
+                if os.environ.get('DEBUG') == 'pico':
+                    debug("response: " + bin_to_hex(message))
+                element = parse_message(message)
+                debug(element)
+                if os.environ.get('DEBUG') == 'pico' and dictdiffer is not None:
+                    for diff in dictdiffer.diff(old_element, element):
+                        debug(diff)
+                old_element = element  # element is rebuilt from scratch each packet
+
+                for readFn, item, elId in readers:
+                    readFn(item, elId)
+
+                # Rate-limit the output to ~1Hz. Every packet is still parsed,
+                # so there is no backlog to drain and the values are fresh
+                now_mono = monotonic()
+                if now_mono - last_emit < 0.9:
+                    continue
+
+                now = datetime.now()  # One clock read per tick, not six
+                output = {
+                    "time": {
+                        "year": now.year % 100,  # Last two digits of the year
+                        "month": now.month,
+                        "day": now.day,
+                        "hour": now.hour,
+                        "minute": now.minute,
+                        "second": now.second
+                    },
+                    "barometer": {},
+                    "inclinometer": {"pitch": None, "roll": None},
+                    "voltage": {},
+                    "current": {},
+                    "temperature": {},
+                    "tank": {},
+                    "battery": {}
                 }
-                filtered_values = {key: value for key, value in values.items() if value is not None}
-                if name and filtered_values and '[' not in name:
-                    if sensorData['type'] == 'barometer':
-                        output["barometer"] = filtered_values["pressure"]
-                    elif sensorData['type'] == 'inclinometer':
-                        if filtered_values["inclinometer_type"] == 1:
-                             output["inclinometer"][name] = filtered_values["degree"]
-                        elif filtered_values["inclinometer_type"] == 2:
-                             output["inclinometer"][name] = filtered_values["degree"]
-                    elif sensorData['type'] == 'volt':
-                        output["voltage"][name] = filtered_values["voltage"]
-                    elif sensorData['type'] == 'current':
-                        output["current"][name] = filtered_values["current"]
-                    elif sensorData['type'] == 'thermometer':
-                        output["temperature"][name] = filtered_values["temperature"]
-                    elif sensorData['type'] == 'tank':
-                        output["tank"][name] = {
-                            "capacity_nominal": sensorData.get('capacity'),
-                            "capacity_remaining": filtered_values.get('remainingCapacity'),
-                            "percentage": int(round(filtered_values.get('percentage', 0)))
-                        }
-                    elif sensorData['type'] == 'battery':
-                        output["battery"][name] = {
-                            "capacity_nominal": sensorData.get('capacity.nominal'),
-                            "capacity_remaining": filtered_values.get('capacity_remaining'),
-                            "state_of_charge": sensorData.get('stateOfCharge'),
-                            "current": filtered_values.get('current'),
-                            "voltage": filtered_values.get('voltage')
-                        }
-                        output["voltage"][name] = filtered_values["voltage"]
-
-            # Send JSON to MQTT server
-            mqtt_topic = mqtt_config['prefix']
-            mqtt_client.publish(mqtt_topic, json.dumps(output))
-
-            time.sleep(0.9)
-            empty_socket(client)
+
+                # Each type reads only the fields it publishes; no intermediate dicts
+                for sensorId, sensorData in sensorListTmp.items():
+                    sensorConfig = sensorList[sensorId]
+                    name = sensorConfig.get('name')
+                    if not name or '[' in name:
+                        continue
+                    sensorType = sensorConfig['type']
+                    if sensorType == 'barometer':
+                        pressure = sensorData.get('pressure')
+                        if pressure is not None:
+                            output["barometer"] = pressure
+                    elif sensorType == 'inclinometer':
+                        degree = sensorData.get('degree')
+                        if degree is not None and sensorConfig.get('inclinometer_type') in (1, 2):
+                            output["inclinometer"][name] = degree
+                    elif sensorType == 'volt':
+                        voltage = sensorData.get('voltage')
+                        if voltage is not None:
+                            output["voltage"][name] = voltage
+                    elif sensorType == 'current':
+                        current = sensorData.get('current')
+                        if current is not None:
+                            output["current"][name] = current
+                    elif sensorType == 'thermometer':
+                        temperature = sensorData.get('temperature')
+                        if temperature is not None:
+                            output["temperature"][name] = temperature
+                    elif sensorType == 'tank':
+                        if sensorData:
+                            output["tank"][name] = {
+                                "capacity_nominal": sensorConfig.get('capacity'),
+                                "capacity_remaining": sensorData.get('remainingCapacity'),
+                                "percentage": int(round(sensorData.get('percentage', 0)))
+                            }
+                    elif sensorType == 'battery':
+                        voltage = sensorData.get('voltage')
+                        if voltage is not None:
+                            output["battery"][name] = {
+                                "capacity_nominal": sensorData.get('capacity.nominal'),
+                                "capacity_remaining": sensorData.get('capacity.remaining'),
+                                "state_of_charge": sensorData.get('stateOfCharge'),
+                                "current": sensorData.get('current'),
+                                "voltage": voltage
+                            }
+                            output["voltage"][name] = voltage
+
+                # Send JSON to MQTT server
+                if orjson is not None:
+                    publish(mqtt_topic, orjson.dumps(output))  # paho accepts bytes payloads
+                else:
+                    publish(mqtt_topic, json.dumps(output))
+                last_emit = now_mono
+
+main()
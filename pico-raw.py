@@ -4,7 +4,6 @@ import os
 import time
 import socket
 import sys
-import select
 import requests
 import json
 import brainsmoke
@@ -20,12 +19,12 @@ def debug(string):
             sys.stdout.flush()
 
 def empty_socket(sock):
-    """remove the data present on the socket"""
-    input = [sock]
-    while 1:
-        inputready, o, e = select.select(input,[],[], 0.0)
-        if len(inputready)==0: break
-        for s in inputready: s.recv(1)
+    """remove the data present on the socket, one whole datagram per recv"""
+    while True:
+        try:
+            sock.recv(65536, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
 
 def striplist(l):
     return([x.strip() for x in l])
@@ -62,75 +61,59 @@ def IntToDecimal(integer):
     return integer / float(10)
 
 def BinToHex(message):
-    response = ''
-    for x in message:
-        hexy = format(x, '02x')
-        response = response + hexy + ' '
-    return response
+    # bytes.hex() is C-implemented and much faster than formatting per byte
+    return message.hex(' ') + ' '
 
 def parse(message):
     values = message.split(' ff')
     values = striplist(values)
     return values
 
-def getNextField(response):
-    field_nr = int(response[0:2], 16)
-    field_type = int(response[3:5], 16)
-    if (field_type == 1):
-        data = response[6:17]
-        response = response[21:]
-        a = int(data[0:5].replace(' ','') , 16)
-        b = int(data[6:11].replace(' ','') , 16)
-        field_data = [a, b]
-        return (field_nr, field_data, response)
-    if (field_type == 3):
-        data = response[21:32]
-        response = response[36:]
-        if (data[0:11] == '7f ff ff ff'):
-            return field_nr, '', response
-        else:
-            a = int(data[0:5].replace(' ','') , 16)
-            b = int(data[6:11].replace(' ','') , 16)
-            field_data = [a, b]
-            return field_nr, field_data, response
-    if (field_type == 4): # Text string
-        response = response[21:]
-        nextHex = response[0:2]
-        word = ''
-        while (nextHex != '00'):
-            word += nextHex
-            response = response[3:]
-            nextHex = response[0:2]
-        word = HexToByte(word)
-        response = response[6:] # Strip separator
-        return field_nr, word, response
-    debug( "Unknown field type " + str(field_type))
-
-def parseResponse(response):
+def parse_response_bytes(buf):
+    # One flat loop over the fields: no per-field helper call, so the only
+    # interpreter dispatch left is the int.from_bytes conversions. A numba or
+    # cython build of this was considered and rejected; neither is a
+    # dependency of this project and the loop runs about once a second.
     dict = {}
-    response = response[42:]
-    while (len(response) > 6):
-        field_nr, field_data, response = getNextField(response)
-        dict[field_nr] = field_data
+    off = 14  # strip header
+    end = len(buf) - 2
+    while (off < end):
+        field_nr = buf[off]
+        field_type = buf[off + 1]
+        if (field_type == 1):
+            dict[field_nr] = [int.from_bytes(buf[off + 2:off + 4], 'big'),
+                              int.from_bytes(buf[off + 4:off + 6], 'big')]
+            off = off + 7
+        elif (field_type == 3):
+            if (buf[off + 7:off + 11] == b'\x7f\xff\xff\xff'):
+                dict[field_nr] = ''
+            else:
+                dict[field_nr] = [int.from_bytes(buf[off + 7:off + 9], 'big'),
+                                  int.from_bytes(buf[off + 9:off + 11], 'big')]
+            off = off + 12
+        elif (field_type == 4):  # Text string
+            strEnd = off + 7
+            while buf[strEnd] != 0:  # memoryview has no index(); strings are short
+                strEnd += 1
+            dict[field_nr] = bytes(buf[off + 7:strEnd]).decode('latin-1')
+            off = strEnd + 2  # Strip terminator and separator
+        else:
+            debug("Unknown field type " + str(field_type))
+            break
     return dict
 
 def add_crc(message):
-    fields = message.split()
-    message_int = [int(x,16) for x in fields[1:]]
-    crc_int = brainsmoke.calc_rev_crc16(message_int[0:-1])
+    data = bytes.fromhex(message)
+    crc_int = brainsmoke.calc_rev_crc16_table(data[1:-1], brainsmoke.TABLE_1189)
     return message + " " + hexdump(crc_int)
 
 def send_receive(s, message):
-    bytes = message.count(' ') + 1
     message = bytearray.fromhex(message)
     s.sendall(message)
-    response = ''
-    hex = ''
-    for x in s.recv(1024):
-        hex = format(x, '02x')
-        response = response + hex + ' '
-    print("Raw hex data: " + response)
-    return response
+    # Bulk recv; callers get the raw bytes and hex-format only when needed
+    data = s.recv(1024)
+    print("Raw hex data: " + data.hex(' ') + ' ')
+    return data
 
 def open_tcp(pico_ip, max_retries=5, retry_delay=5):
     serverport = 5001
@@ -159,13 +142,13 @@ def get_pico_config(pico_ip):
     message = ('00 00 00 00 00 ff 02 04 8c 55 4b 00 03 ff')
     message = add_crc(message)
     response = send_receive(s, message)
-    req_count = int(response.split()[19], 16) + 1
+    req_count = response[19] + 1
 
     for pos in range(req_count):
         message = ('00 00 00 00 00 ff 41 04 8c 55 4b 00 16 ff 00 01 00 00 00 ' + "%02x" % pos + ' ff 01 03 00 00 00 00 ff 00 00 00 00 ff')
         message = add_crc(message)
         response = send_receive(s, message)
-        element = parseResponse(response)
+        element = parse_response_bytes(response)
         config[pos] = element
 
     s.close()
@@ -177,106 +160,132 @@ def toTemperature (temp):
     temp2 = float(("%.2f" % round(temp / float(10) + 273.15, 2)))
     return temp2
 
-def createSensorList (config):
+fluid = ['Unknown', 'freshWater', 'fuel', 'wasteWater']
+fluid_type = ['Unknown', 'fresh water', 'diesel', 'blackwater']
+
+def decodeNull(sensor, entry):
+    return 0
+
+def decodeVolt(sensor, entry):
+    sensor['name'] = entry[3]
+    if (entry[3] == 'PICO INTERNAL'):
+        return 6
+    return 1
+
+def decodeCurrent(sensor, entry):
+    sensor['name'] = entry[3]
+    return 2
+
+def decodeTemp(sensor, entry):
+    sensor['name'] = entry[3]
+    return 1
+
+def decodeBaro(sensor, entry):
+    sensor['name'] = entry[3]
+    return 2
+
+def decodeOhm(sensor, entry):
+    sensor['name'] = entry[3]
+    return 1
+
+def decodeTank(sensor, entry):
+    sensor['name'] = entry[3]
+    sensor['capacity'] = entry[7][1] / 10
+    sensor['fluid_type'] = fluid_type[entry[6][1]]
+    sensor['fluid'] = fluid[entry[6][1]]
+    return 1
+
+def decodeBattery(sensor, entry):
+    sensor['name'] = entry[3]
+    sensor['capacity.nominal'] = entry[5][1] * 36 * 12  # In Joule
+    return 5
+
+def decodeIncline(sensor, entry):
+    inclinometer_type = entry[3][1]
+    sensor['inclinometer_type'] = inclinometer_type
+    if inclinometer_type == 1 : sensor['name'] = 'pitch'
+    elif inclinometer_type == 2 : sensor['name'] = 'roll'
+    return 1
+
+# Sensor type id -> (type name, decoder); the decoder fills in the static
+# config for that type and returns how many telemetry elements it occupies
+TYPE_INFO = {
+    0: ('null', decodeNull),
+    1: ('volt', decodeVolt),
+    2: ('current', decodeCurrent),
+    3: ('thermometer', decodeTemp),
+    5: ('barometer', decodeBaro),
+    6: ('ohm', decodeOhm),
+    8: ('tank', decodeTank),
+    9: ('battery', decodeBattery),
+    13: ('inclinometer', decodeIncline)
+}
+
+def createSensorList(config):
     sensorList = {}
-    fluid = ['Unknown', 'freshWater', 'fuel','wasteWater']
-    fluid_type = ['Unknown', 'fresh water', 'diesel','blackwater']
     elementPos = 0
-    for entry in config.keys():
-        id = config[entry][0][1]
-        type = config[entry][1][1]
-        elementSize = 1
-        sensorList[id] = {}
-        if (type == 0):
-            type = 'null'
-            elementSize = 0
-        if (type == 1):
-            type = 'volt'
-            sensorList[id].update({'name': config[entry][3]})
-            if (config[entry][3] == 'PICO INTERNAL'):
-                elementSize = 6
-        if (type == 2):
-            type = 'current'
-            sensorList[id].update({'name': config[entry][3]})
-            elementSize = 2
-        if (type == 3):
-            type = 'thermometer'
-            sensorList[id].update({'name': config[entry][3]})
-        if (type == 5):
-            type = 'barometer'
-            sensorList[id].update({'name': config[entry][3]})
-            elementSize = 2
-        if (type == 6):
-            type = 'ohm'
-            sensorList[id].update({'name': config[entry][3]})
-        if (type == 8):
-            type = 'tank'
-            sensorList[id].update({'name': config[entry][3]})
-            sensorList[id].update({'capacity': config[entry][7][1]/10})
-            sensorList[id].update({'fluid_type': fluid_type[config[entry][6][1]]})
-            sensorList[id].update({'fluid': fluid[config[entry][6][1]]})
-        if (type == 9):
-            type = 'battery'
-            sensorList[id].update({'name': config[entry][3]})
-            sensorList[id].update({'capacity.nominal': config[entry][5][1]*36*12})  # In Joule
-            elementSize = 5
-        if (type == 13):
-            type = 'inclinometer'
-            inclinometer_type = config[entry][3][1]
-            sensorList[id].update({'inclinometer_type': inclinometer_type})
-            if inclinometer_type == 1 : sensorList[id].update({'name' :'pitch'})
-            elif inclinometer_type == 2 : sensorList[id].update({'name' :'roll'})
-            elementSize = 1
-
-        sensorList[id].update({'type': type, 'pos': elementPos})
+    for entry in config.values():
+        id = entry[0][1]
+        type = entry[1][1]
+        sensor = sensorList[id] = {}
+        if type in TYPE_INFO:
+            type, decoder = TYPE_INFO[type]
+            elementSize = decoder(sensor, entry)
+        else:
+            elementSize = 1  # Unknown types keep their numeric id
+        sensor['type'] = type
+        sensor['pos'] = elementPos
         elementPos = elementPos + elementSize
     return sensorList
 
 def readBaro(sensorId, elementId):
-    sensorListTmp[sensorId].update({'pressure': (element[elementId][1] + 65536) / 100})
+    sensorListTmp[sensorId]['pressure'] = (element[elementId][1] + 65536) / 100
 
 def readTemp(sensorId, elementId):
-    sensorListTmp[sensorId].update({'temperature': toTemperature(element[elementId][1])})
+    sensorListTmp[sensorId]['temperature'] = toTemperature(element[elementId][1])
 
 def readTank(sensorId, elementId):
+    d = sensorListTmp[sensorId]
     currentLevel = element[elementId][0] / float(1000)
     capacity = sensorList[sensorId].get('capacity', 0)
     remainingCapacity = element[elementId][1] / float(10)
     percentage = (remainingCapacity / capacity) * 100 if capacity else 0
-    sensorListTmp[sensorId].update({'currentLevel': currentLevel})
-    sensorListTmp[sensorId].update({'remainingCapacity': remainingCapacity})
-    sensorListTmp[sensorId].update({'percentage': percentage})
+    d['currentLevel'] = currentLevel
+    d['remainingCapacity'] = remainingCapacity
+    d['percentage'] = percentage
 
 def readBatt(sensorId, elementId):
+    d = sensorListTmp[sensorId]
     stateOfCharge = (element[elementId][0] / 160.0)
-    sensorListTmp[sensorId].update({'stateOfCharge': stateOfCharge})
+    d['stateOfCharge'] = stateOfCharge
     capacity = sensorList[sensorId].get('capacity.nominal', 0)
     capacity_remaining = (capacity * stateOfCharge / 4320000)
-    sensorListTmp[sensorId].update({'capacity.remaining': capacity_remaining})
-    sensorListTmp[sensorId].update({'voltage': element[elementId + 2][1] / float(1000)})
-    sensorListTmp[sensorId]['capacity.nominal'] = sensorListTmp[sensorId]['capacity.nominal'] / 43200
+    d['capacity.remaining'] = capacity_remaining
+    d['voltage'] = element[elementId + 2][1] / float(1000)
+    d['capacity.nominal'] = d['capacity.nominal'] / 43200
     current = element[elementId + 1][1]
     if (current > 25000):
         current = (65535 - current) / float(100)
     else:
         current = current / float(100) * -1
-    sensorListTmp[sensorId].update({'current': -abs(current)})
+    d['current'] = -abs(current)
     if (element[elementId][0] != 65535):
         timeRemaining = round(sensorList[sensorId]['capacity.nominal'] / 12 / ((current * stateOfCharge / 100) + 0.001))
         if (timeRemaining < 0):
             timeRemaining = 60 * 60 * 24 * 7  # One week
-        sensorListTmp[sensorId].update({'capacity.timeRemaining': timeRemaining})
+        d['capacity.timeRemaining'] = timeRemaining
 
 def readBattNameVoltage(sensorId, elementId):
-    voltage = element[elementId + 2][1] / float(1000)
-    name = sensorList[sensorId].get('name')
-    sensorListTmp[sensorId].update({'name': name, 'voltage': voltage, 'type': 'battery'})
+    d = sensorListTmp[sensorId]
+    d['name'] = sensorList[sensorId].get('name')
+    d['voltage'] = element[elementId + 2][1] / float(1000)
+    d['type'] = 'battery'
 
 def readVolt(sensorId, elementId):
-    sensorListTmp[sensorId].update({'voltage': element[elementId][1] / float(1000)})
+    sensorListTmp[sensorId]['voltage'] = element[elementId][1] / float(1000)
 
 def readOhm(sensorId, elementId):
-    sensorListTmp[sensorId].update({'ohm': element[elementId][1]})
+    sensorListTmp[sensorId]['ohm'] = element[elementId][1]
 
 def readCurrent(sensorId, elementId):
     current = element[elementId][1]
@@ -284,7 +293,7 @@ def readCurrent(sensorId, elementId):
         current = (65535 - current) / float(100)
     else:
         current = current / float(100) * -1
-    sensorListTmp[sensorId].update({'current': -abs(current)})
+    sensorListTmp[sensorId]['current'] = -abs(current)
 
 def readIncline(sensorId, elementId):
     degree = element[elementId][1]
@@ -292,13 +301,14 @@ def readIncline(sensorId, elementId):
         degree = (65535 - degree) / 10
     else:
         degree = degree / -10
-    sensorListTmp[sensorId].update({'degree': degree})
+    sensorListTmp[sensorId]['degree'] = degree
 
 debug("Start UDP listener")
 client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 client.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)  # Bound the kernel backlog
 client.bind(("", 43210))
 message, addr = client.recvfrom(2048)
 pico_ip = addr[0]
@@ -327,10 +337,10 @@ if response[18] == 'b':
     else:
         pos = 0
 
-element = parseResponse(response)
-for item in sensorList:
-    elId = sensorList[item]['pos']
-    itemType = sensorList[item]['type']
+element = parse_response_bytes(message)
+# Position and type are fixed after createSensorList; look them up once
+SENSOR_ITEMS = [(sensorId, sensor['pos'], sensor['type']) for sensorId, sensor in sensorList.items()]
+for item, elId, itemType in SENSOR_ITEMS:
     if (itemType == 'barometer'):
         readBaro(item, elId)
     if (itemType == 'thermometer'):